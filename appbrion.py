@@ -23,17 +23,37 @@ st.markdown("---")
 base_dir = os.path.dirname(__file__)
 csv_path = os.path.join(base_dir, "final_brion_data.csv")
 
-# 최종 데이터 파일 로드 (pcbrion.py와 동일)
-try:
+# 조건 완화 추천 우선순위 (pcbrion.py와 동일): Stage, Subtype은 항상 유지하고 PDL1 → gBRCA → OncotypeDx 순으로 완화
+filter_keys = ["Stage", "Subtype", "OncotypeDx", "gBRCA", "PDL1"]
+relax_order = ["PDL1", "gBRCA", "OncotypeDx"]
+
+
+# 최종 데이터 파일 로드 및 완화 단계별 (조건 값 튜플 → 행 위치) 인덱스 사전 계산
+# - Streamlit은 위젯 변경마다 스크립트를 다시 실행하므로 cache_resource로 한 번만 계산하고 복사 없이 재사용
+# - 이후 매 실행에서는 딕셔너리 조회만 수행
+@st.cache_resource(show_spinner=False)
+def load_data(csv_path):
     df = pd.read_csv(csv_path, encoding='cp949')
+
+    # 치료 단계 순서 정의 및 정렬
+    treatment_order = ["Neoadjuvant", "Adjuvant", "1st line", "2nd+ line", "Recurrent"]
+    df["TreatmentLine"] = pd.Categorical(df["TreatmentLine"], categories=treatment_order, ordered=True)
+
+    relax_levels = []
+    for level in range(len(relax_order) + 1):
+        relaxed = relax_order[:level]
+        keys = [key for key in filter_keys if key not in relaxed]
+        relax_levels.append((keys, relaxed, df.groupby(keys, sort=False).indices))
+    return df, relax_levels
+
+
+# 파일이 없을 때의 실패는 캐시되지 않도록 예외 처리는 캐시 함수 밖에서 수행 (pcbrion.py와 동일)
+try:
+    df, relax_levels = load_data(csv_path)
 except FileNotFoundError:
     st.error("final_brion_data.csv 파일을 찾을 수 없습니다. 앱 파일과 동일한 위치에 파일을 추가해주세요.")
     st.stop()
 
-# 치료 단계 순서 정의 및 정렬
-treatment_order = ["Neoadjuvant", "Adjuvant", "1st line", "2nd+ line", "Recurrent"]
-df["TreatmentLine"] = pd.Categorical(df["TreatmentLine"], categories=treatment_order, ordered=True)
-
 st.markdown("### 1️⃣ 병기 및 병리 정보 입력")
 
 # T/N 사용자 정의 값 반영 (pcbrion.py와 동일)
@@ -59,6 +79,7 @@ pr = st.radio("PR Status", ["Neg (-)", "Pos (+)"], horizontal=True)
 oncotype = st.selectbox("OncotypeDx 조건", sorted(df['OncotypeDx'].dropna().unique()))
 gbrca = st.selectbox("gBRCA 여부", sorted(df['gBRCA'].dropna().unique()))
 pdl1 = st.selectbox("PD-L1 상태", sorted(df['PDL1'].dropna().unique()))
+use_relax = st.checkbox("일치하는 약제가 없으면 조건을 완화하여 가장 가까운 추천 보기 (PDL1 → gBRCA → OncotypeDx 순)", value=True)
 
 t = t_mapping[t_raw]
 n = n_mapping[n_raw]
@@ -92,19 +113,28 @@ st.markdown(f"#### **계산된 병기:** {stage} | **계산된 아형:** {subtyp
 st.markdown("---")
 
 # 필터링 (pcbrion.py와 동일)
-filtered_df = df[
-    (df['Stage'] == stage) &
-    (df['Subtype'] == subtype) &
-    (df['OncotypeDx'] == oncotype) &
-    (df['gBRCA'] == gbrca) &
-    (df['PDL1'] == pdl1)
-].sort_values("TreatmentLine")
+selected = {
+    "Stage": stage, "Subtype": subtype,
+    "OncotypeDx": oncotype, "gBRCA": gbrca, "PDL1": pdl1
+}
+
+# 정확히 일치하는 결과가 없으면 (조건 완화 사용 시) 우선순위에 따라 조건을 완화하며 사전 계산된 인덱스 조회
+filtered_df = df.iloc[0:0]
+relaxed_keys = []
+for keys, relaxed, index in (relax_levels if use_relax else relax_levels[:1]):
+    rows = index.get(tuple(selected[key] for key in keys))
+    if rows is not None:
+        filtered_df = df.iloc[rows].sort_values("TreatmentLine")
+        relaxed_keys = relaxed
+        break
 
 st.markdown("### 2️⃣ 치료전략 및 약제 추천 결과")
 
 if filtered_df.empty:
     st.warning("선택된 조건에 맞는 추천 약제가 없습니다. 다른 조건을 선택해보세요.")
 else:
+    if relaxed_keys:
+        st.info(f"🔄 정확히 일치하는 추천 약제가 없어 다음 조건을 완화한 결과입니다: {', '.join(relaxed_keys)}")
     for _, row in filtered_df.iterrows():
         # 결과 출력 Expander
         expander_title = f"🩺 치료 단계: {row['TreatmentLine']} | 💊 약제명: {row['RecommendedRegimen']}"
@@ -138,4 +168,9 @@ else:
             # 최종 데이터 파일의 컬럼을 직접 출력
             st.markdown(f"**💉 권장 용량:** {row['권장용량_표시']}")
             st.markdown(f"**💊 1회 용량(160cm/60kg)mg:** {dose_per_session}")
-            st.markdown(f"**💰 최종 비용:** {row['단가_표시']}")
\ No newline at end of file
+            st.markdown(f"**💰 최종 비용:** {row['단가_표시']}")
+
+            # 완화된 조건이 있으면 해당 약제의 실제 조건 값 표시 (pcbrion.py와 동일)
+            if relaxed_keys:
+                relaxed_values = ', '.join(f"{key}: {row[key]}" for key in relaxed_keys)
+                st.markdown(f"**🔄 완화된 조건 값:** {relaxed_values}")
\ No newline at end of file